@@ -0,0 +1,216 @@
+/*
+ * Capture Screenshots and Performance Metrics of a Webpage/HTML File
+ * using a single page load.
+ *
+ * Usage: node capture.js '<JSON encoded options>'
+ *
+ * Options:
+ *   url: URL or HTML file path to capture
+ *   screenshot: Capture screenshots (default: true)
+ *   elements: CSS selectors or `clip:x,y,width,height` rectangles to capture
+ *     instead of the full page (default: [])
+ *   metrics: Collect performance metrics (default: false)
+ *
+ * Prints a JSON object to stdout:
+ *   {
+ *     "screenshots": [{"name": "<selector>" | null, "data": "<base64 encoded PNG>"}],
+ *     "errors": ["<error message>"],
+ *     "metrics": {...} | null
+ *   }
+ */
+const path = require('path');
+const { pathToFileURL } = require('url');
+
+const puppeteer = require('puppeteer');
+
+// Same defaults as `capture-website`
+const VIEWPORT = { width: 1280, height: 800, deviceScaleFactor: 2 };
+const TIMEOUT = 60 * 1000;
+const CLIP_PREFIX = 'clip:';
+
+function getPageUrl(urlOrFilePath) {
+  if (/^(https?|file|data):/i.test(urlOrFilePath)) {
+    return urlOrFilePath;
+  }
+  return pathToFileURL(path.resolve(urlOrFilePath)).href;
+}
+
+// Runs in the page before any other script so that
+// no LCP or layout shift entries are missed.
+function observePaintMetrics() {
+  window.__webpageScreenshotMetrics = {
+    largestContentfulPaint: null,
+    cumulativeLayoutShift: 0,
+  };
+
+  try {
+    new PerformanceObserver((list) => {
+      const entries = list.getEntries();
+      const lastEntry = entries[entries.length - 1];
+      window.__webpageScreenshotMetrics.largestContentfulPaint = (
+        lastEntry.renderTime || lastEntry.startTime
+      );
+    }).observe({ type: 'largest-contentful-paint', buffered: true });
+
+    new PerformanceObserver((list) => {
+      for (const entry of list.getEntries()) {
+        if (!entry.hadRecentInput) {
+          window.__webpageScreenshotMetrics.cumulativeLayoutShift += entry.value;
+        }
+      }
+    }).observe({ type: 'layout-shift', buffered: true });
+  } catch (e) {
+    // Performance entry type is not supported by the browser
+  }
+}
+
+async function trackNetwork(page) {
+  const network = { transferSize: 0, requestCount: 0 };
+  const client = await page.target().createCDPSession();
+
+  await client.send('Network.enable');
+  client.on('Network.requestWillBeSent', () => {
+    network.requestCount += 1;
+  });
+  client.on('Network.loadingFinished', (event) => {
+    network.transferSize += event.encodedDataLength;
+  });
+
+  return network;
+}
+
+async function collectMetrics(page, network) {
+  const pageMetrics = await page.evaluate(() => {
+    const [navigation] = performance.getEntriesByType('navigation');
+    const paintMetrics = window.__webpageScreenshotMetrics || {};
+
+    return {
+      time_to_first_byte: navigation ? navigation.responseStart : null,
+      dom_content_loaded: navigation ? navigation.domContentLoadedEventEnd : null,
+      load: navigation ? navigation.loadEventEnd : null,
+      largest_contentful_paint: paintMetrics.largestContentfulPaint,
+      cumulative_layout_shift: paintMetrics.cumulativeLayoutShift,
+    };
+  });
+
+  return {
+    ...pageMetrics,
+    transfer_size: network.transferSize,
+    request_count: network.requestCount,
+  };
+}
+
+function parseClip(element) {
+  const values = element.slice(CLIP_PREFIX.length).split(',').map(Number);
+
+  if (values.length !== 4 || values.some((value) => !Number.isFinite(value))) {
+    return null;
+  }
+
+  const [x, y, width, height] = values;
+
+  if (width <= 0 || height <= 0) {
+    return null;
+  }
+
+  return { x, y, width, height };
+}
+
+// Capture all the elements and clip rectangles from the loaded page
+async function captureElements(page, elements, result) {
+  for (const element of elements) {
+    if (element.startsWith(CLIP_PREFIX)) {
+      const clip = parseClip(element);
+
+      if (!clip) {
+        result.errors.push(`Invalid clip rectangle "${element}"`);
+        continue;
+      }
+
+      try {
+        result.screenshots.push({
+          name: element,
+          data: await page.screenshot({ clip, encoding: 'base64' }),
+        });
+      } catch (error) {
+        result.errors.push(`Unable to capture "${element}": ${error.message}`);
+      }
+      continue;
+    }
+
+    let handles;
+    try {
+      handles = await page.$$(element);
+    } catch (error) {
+      result.errors.push(`Invalid selector "${element}": ${error.message}`);
+      continue;
+    }
+
+    if (!handles.length) {
+      result.errors.push(`No elements found for selector "${element}"`);
+    }
+
+    for (const [index, handle] of handles.entries()) {
+      const name = handles.length > 1 ? `${element} (${index + 1})` : element;
+
+      try {
+        result.screenshots.push({
+          name,
+          data: await handle.screenshot({ encoding: 'base64' }),
+        });
+      } catch (error) {
+        result.errors.push(`Unable to capture "${name}": ${error.message}`);
+      }
+    }
+  }
+}
+
+async function capture(options) {
+  const browser = await puppeteer.launch({ args: ['--no-sandbox'] });
+  const result = { screenshots: [], errors: [], metrics: null };
+  const elements = options.elements || [];
+
+  try {
+    const page = await browser.newPage();
+    await page.setViewport(VIEWPORT);
+
+    let network = null;
+    if (options.metrics) {
+      await page.evaluateOnNewDocument(observePaintMetrics);
+      network = await trackNetwork(page);
+    }
+
+    await page.goto(getPageUrl(options.url), {
+      timeout: TIMEOUT,
+      waitUntil: 'networkidle2',
+    });
+
+    // Collect metrics before taking the screenshot, as resizing the page
+    // for a full page screenshot can cause additional layout shifts.
+    if (options.metrics) {
+      result.metrics = await collectMetrics(page, network);
+    }
+
+    if (options.screenshot !== false && elements.length) {
+      await captureElements(page, elements, result);
+    } else if (options.screenshot !== false) {
+      result.screenshots.push({
+        name: null,
+        data: await page.screenshot({ fullPage: true, encoding: 'base64' }),
+      });
+    }
+  } finally {
+    await browser.close();
+  }
+
+  return result;
+}
+
+capture(JSON.parse(process.argv[2]))
+  .then((result) => {
+    process.stdout.write(JSON.stringify(result));
+  })
+  .catch((error) => {
+    process.stderr.write(`${error.stack || error}\n`);
+    process.exit(1);
+  });
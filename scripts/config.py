@@ -1,5 +1,18 @@
 import dataclasses
-from typing import List
+import json
+from typing import Dict, List
+
+
+# Display name and unit of the performance metrics
+PERFORMANCE_METRICS = {
+    'time_to_first_byte': ('Time to First Byte', 'ms'),
+    'dom_content_loaded': ('DOM Content Loaded', 'ms'),
+    'load': ('Load', 'ms'),
+    'largest_contentful_paint': ('Largest Contentful Paint', 'ms'),
+    'cumulative_layout_shift': ('Cumulative Layout Shift', ''),
+    'transfer_size': ('Transfer Size', 'bytes'),
+    'request_count': ('Requests', 'count'),
+}
 
 
 @dataclasses.dataclass
@@ -11,19 +24,56 @@ class Configuration:
     GITHUB_REPOSITORY: str
     GITHUB_TOKEN: str
     GITHUB_EVENT_NAME: str
+    GITHUB_SHA: str = ''
+    GITHUB_BASE_REF: str = ''
 
     UPLOAD_SERVICE_GITHUB_BRANCH: str = 'github_branch'
     UPLOAD_SERVICE_IMGUR: str = 'imgur'
+    UPLOAD_SERVICE_S3: str = 's3'
+    UPLOAD_SERVICE_LOCAL_DIRECTORY: str = 'local_directory'
+
+    S3_URL_TYPE_PUBLIC: str = 'public'
+    S3_URL_TYPE_PRESIGNED: str = 'presigned'
 
     PULL_REQUEST_EVENT: str = 'pull_request'
+    PUSH_EVENT: str = 'push'
     SUPPORTED_EVENT_NAMES: list = dataclasses.field(
-        default_factory=lambda: ['pull_request']
+        default_factory=lambda: ['pull_request', 'push']
     )
 
+    PERFORMANCE_METRIC_NAMES: tuple = tuple(PERFORMANCE_METRICS)
+
     UPLOAD_TO: str = UPLOAD_SERVICE_GITHUB_BRANCH
     CAPTURE_HTML_FILE_PATHS: List[str] = dataclasses.field(default_factory=list)
     CAPTURE_URLS: List[str] = dataclasses.field(default_factory=list)
     CAPTURE_CHANGED_HTML_FILES: bool = True
+    CAPTURE_ELEMENTS: Dict[str, List[str]] = dataclasses.field(
+        default_factory=dict
+    )
+
+    # Performance Metrics
+    CAPTURE_PERFORMANCE_METRICS: bool = False
+    PERFORMANCE_BUDGETS: Dict[str, Dict[str, float]] = dataclasses.field(
+        default_factory=dict
+    )
+    FAIL_ON_PERFORMANCE_REGRESSION: bool = False
+
+    # S3 Compatible Object Storage Upload Service
+    S3_BUCKET: str = ''
+    S3_ENDPOINT_URL: str = ''
+    S3_REGION: str = ''
+    S3_ACCESS_KEY_ID: str = ''
+    S3_SECRET_ACCESS_KEY: str = ''
+    S3_KEY_PREFIX: str = 'webpage-screenshots'
+    S3_URL_TYPE: str = S3_URL_TYPE_PUBLIC
+    S3_PUBLIC_URL_BASE: str = ''
+    S3_PRESIGNED_URL_EXPIRY: int = 604800
+    S3_MAX_CONCURRENCY: int = 10
+    S3_MULTIPART_THRESHOLD_MB: int = 8
+
+    # Local Directory Upload Service
+    LOCAL_DIRECTORY_PATH: str = 'webpage-screenshots'
+    LOCAL_DIRECTORY_BASE_URL: str = ''
 
     @staticmethod
     def convert_string_to_list(string):
@@ -44,16 +94,139 @@ class Configuration:
     def validate_capture_changed_html_files(cls, value):
         return str(value).lower() in ["1", "true", "yes"]
 
+    @staticmethod
+    def convert_string_to_positive_int(string, default):
+        """Helper method to convert a string to a positive integer"""
+        try:
+            value = int(str(string).strip())
+        except ValueError:
+            return default
+        return value if value > 0 else default
+
+    @classmethod
+    def validate_capture_elements(cls, value):
+        """
+        Parse JSON mapping of URLs/HTML file paths to the elements to capture.
+
+        Elements can be CSS selectors or `clip:x,y,width,height` rectangles,
+        invalid mappings are ignored.
+
+        Example: `{"index.html": ["#header", ".card"], "about.html": "clip:0,0,800,600"}`
+        """
+        try:
+            mapping = json.loads(value)
+        except ValueError:
+            return {}
+
+        if not isinstance(mapping, dict):
+            return {}
+
+        capture_elements = {}
+
+        for url_or_file_path, elements in mapping.items():
+            if isinstance(elements, str):
+                elements = [elements]
+
+            if not isinstance(elements, list):
+                continue
+
+            elements = [
+                element.strip() for element in elements
+                if isinstance(element, str) and element.strip()
+            ]
+
+            if elements:
+                capture_elements[url_or_file_path.strip()] = elements
+
+        return capture_elements
+
+    @classmethod
+    def validate_capture_performance_metrics(cls, value):
+        return str(value).lower() in ["1", "true", "yes"]
+
+    @classmethod
+    def validate_fail_on_performance_regression(cls, value):
+        return str(value).lower() in ["1", "true", "yes"]
+
+    @classmethod
+    def validate_performance_budgets(cls, value):
+        """
+        Parse comma seperated performance budgets.
+
+        Absolute budgets are written as `metric=limit`
+        and budgets relative to the base branch as `metric=+percent%`.
+        Both can be used for the same metric, invalid and negative
+        budgets are ignored.
+
+        Example: `largest_contentful_paint=2500, transfer_size=+10%`
+        """
+        budgets = {}
+
+        for budget in cls.convert_string_to_list(value):
+            metric, _, limit = budget.partition('=')
+            metric, limit = metric.strip().lower(), limit.strip()
+
+            if metric not in cls.PERFORMANCE_METRIC_NAMES:
+                continue
+
+            budget_type = 'absolute'
+
+            if limit.endswith('%'):
+                budget_type = 'relative'
+                limit = limit[:-1]
+
+            try:
+                limit = float(limit)
+            except ValueError:
+                continue
+
+            if limit < 0:
+                continue
+
+            budgets.setdefault(metric, {})[budget_type] = limit
+
+        return budgets
+
     @classmethod
     def validate_upload_to(cls, value):
+        # Available services are checked against the
+        # image upload service registry when the action runs
+        return str(value).strip().lower()
+
+    @classmethod
+    def validate_s3_url_type(cls, value):
         value = str(value).lower()
         if value not in [
-            cls.UPLOAD_SERVICE_GITHUB_BRANCH,
-            cls.UPLOAD_SERVICE_IMGUR
+            cls.S3_URL_TYPE_PUBLIC,
+            cls.S3_URL_TYPE_PRESIGNED
         ]:
-            return cls.UPLOAD_SERVICE_GITHUB_BRANCH
+            return cls.S3_URL_TYPE_PUBLIC
         return value
 
+    @classmethod
+    def validate_s3_key_prefix(cls, value):
+        return str(value).strip().strip('/')
+
+    @classmethod
+    def validate_s3_public_url_base(cls, value):
+        return str(value).strip().rstrip('/')
+
+    @classmethod
+    def validate_s3_presigned_url_expiry(cls, value):
+        return cls.convert_string_to_positive_int(value, 604800)
+
+    @classmethod
+    def validate_s3_max_concurrency(cls, value):
+        return cls.convert_string_to_positive_int(value, 10)
+
+    @classmethod
+    def validate_s3_multipart_threshold_mb(cls, value):
+        return cls.convert_string_to_positive_int(value, 8)
+
+    @classmethod
+    def validate_local_directory_base_url(cls, value):
+        return str(value).strip().rstrip('/')
+
     @classmethod
     def from_environment(cls, environment):
         """Initialize Configuration from Environment Variables"""
@@ -61,11 +234,30 @@ class Configuration:
             'GITHUB_REPOSITORY',
             'GITHUB_REF',
             'GITHUB_EVENT_NAME',
+            'GITHUB_SHA',
+            'GITHUB_BASE_REF',
             'INPUT_GITHUB_TOKEN',
             'INPUT_UPLOAD_TO',
             'INPUT_CAPTURE_CHANGED_HTML_FILES',
             'INPUT_CAPTURE_HTML_FILE_PATHS',
-            'INPUT_CAPTURE_URLS'
+            'INPUT_CAPTURE_URLS',
+            'INPUT_CAPTURE_ELEMENTS',
+            'INPUT_CAPTURE_PERFORMANCE_METRICS',
+            'INPUT_PERFORMANCE_BUDGETS',
+            'INPUT_FAIL_ON_PERFORMANCE_REGRESSION',
+            'INPUT_S3_BUCKET',
+            'INPUT_S3_ENDPOINT_URL',
+            'INPUT_S3_REGION',
+            'INPUT_S3_ACCESS_KEY_ID',
+            'INPUT_S3_SECRET_ACCESS_KEY',
+            'INPUT_S3_KEY_PREFIX',
+            'INPUT_S3_URL_TYPE',
+            'INPUT_S3_PUBLIC_URL_BASE',
+            'INPUT_S3_PRESIGNED_URL_EXPIRY',
+            'INPUT_S3_MAX_CONCURRENCY',
+            'INPUT_S3_MULTIPART_THRESHOLD_MB',
+            'INPUT_LOCAL_DIRECTORY_PATH',
+            'INPUT_LOCAL_DIRECTORY_BASE_URL',
         ]
 
         config = {}
@@ -94,3 +286,10 @@ class Configuration:
         if "refs/pull/" in self.GITHUB_REF:
             return int(self.GITHUB_REF.split("/")[2])
         return None
+
+    @property
+    def GITHUB_BRANCH_NAME(self):
+        """Get the branch name from `GITHUB_REF` for push events"""
+        if self.GITHUB_REF.startswith('refs/heads/'):
+            return self.GITHUB_REF.replace('refs/heads/', '', 1)
+        return None
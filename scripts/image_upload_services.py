@@ -1,16 +1,46 @@
 import base64
+import io
+import os
 import subprocess
 import time
+from concurrent.futures import ThreadPoolExecutor
 from functools import cached_property
+from urllib.parse import quote
 
+import boto3
 import requests
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config as BotoConfig
+from botocore.exceptions import BotoCoreError, ClientError
 
+from config import Configuration
 from helpers import print_message
 
 
+# Registry of all the available Image Upload Services.
+# Maps the `upload_to` input value to the Image Upload Service Class.
+IMAGE_UPLOAD_SERVICES = {}
+
+
+def register_image_upload_service(name):
+    """Class decorator to register an Image Upload Service"""
+    def decorator(service_class):
+        IMAGE_UPLOAD_SERVICES[name] = service_class
+        return service_class
+    return decorator
+
+
+def get_image_upload_service(name):
+    """Get a registered Image Upload Service Class by name"""
+    return IMAGE_UPLOAD_SERVICES.get(name)
+
+
 class ImageUploadServiceBase:
     """Base Class for All Image Upload Services"""
 
+    # Seconds to wait after each successful image upload
+    UPLOAD_DELAY_SECONDS = 2
+
     def __init__(self, configuration):
         self.configuration = configuration
         self.images_to_upload = []
@@ -25,6 +55,15 @@ class ImageUploadServiceBase:
         """
         return None
 
+    def _add_uploaded_image(self, file, image_url):
+        self.uploaded_images.append(
+            {
+                'file_path': file['file_path'],
+                'filename': file['filename'],
+                'url': image_url
+            }
+        )
+
     def add(self, file_path, filename, image_data):
         self.images_to_upload.append(
             {
@@ -50,24 +89,21 @@ class ImageUploadServiceBase:
         print_message('Upload Screenshots', message_type='group')
 
         for file in self.images_to_upload:
-            filename = file['filename']
-            image_url = self._upload_single_image(filename, file['data'])
+            image_url = self._upload_single_image(
+                file['filename'], file['data']
+            )
             if image_url:
-                self.uploaded_images.append(
-                    {
-                        'file_path': file['file_path'],
-                        'filename': filename,
-                        'url': image_url
-                    }
-                )
-                # Sleep for 2 seconds after each successful image upload
-                time.sleep(2)
+                self._add_uploaded_image(file, image_url)
+                # Sleep after each successful image upload
+                if self.UPLOAD_DELAY_SECONDS:
+                    time.sleep(self.UPLOAD_DELAY_SECONDS)
 
         print_message('', message_type='endgroup')
 
         return self.uploaded_images
 
 
+@register_image_upload_service(Configuration.UPLOAD_SERVICE_IMGUR)
 class ImgurImageUploadService(ImageUploadServiceBase):
     """Service to Upload Images to Imgur"""
 
@@ -99,6 +135,7 @@ class ImgurImageUploadService(ImageUploadServiceBase):
             return None
 
 
+@register_image_upload_service(Configuration.UPLOAD_SERVICE_GITHUB_BRANCH)
 class GitHubBranchImageUploadService(ImageUploadServiceBase):
     """Service to Upload Images to GitHub Branch"""
 
@@ -200,3 +237,205 @@ class GitHubBranchImageUploadService(ImageUploadServiceBase):
         self._setup_git_branch()
 
         return super().upload()
+
+
+@register_image_upload_service(Configuration.UPLOAD_SERVICE_S3)
+class S3ImageUploadService(ImageUploadServiceBase):
+    """Service to Upload Images to S3 Compatible Object Storage"""
+
+    CONTENT_TYPE = 'image/png'
+
+    @cached_property
+    def _client(self):
+        """Get S3 client, connections are pooled and shared between threads"""
+        client_kwargs = {
+            'config': BotoConfig(
+                max_pool_connections=self.configuration.S3_MAX_CONCURRENCY,
+                retries={'max_attempts': 5, 'mode': 'standard'},
+                signature_version='s3v4',
+            )
+        }
+
+        if self.configuration.S3_ENDPOINT_URL:
+            client_kwargs['endpoint_url'] = self.configuration.S3_ENDPOINT_URL
+
+        if self.configuration.S3_REGION:
+            client_kwargs['region_name'] = self.configuration.S3_REGION
+
+        # Use the default AWS credential chain if credentials are not provided
+        if (
+            self.configuration.S3_ACCESS_KEY_ID and
+            self.configuration.S3_SECRET_ACCESS_KEY
+        ):
+            client_kwargs['aws_access_key_id'] = (
+                self.configuration.S3_ACCESS_KEY_ID
+            )
+            client_kwargs['aws_secret_access_key'] = (
+                self.configuration.S3_SECRET_ACCESS_KEY
+            )
+
+        return boto3.session.Session().client('s3', **client_kwargs)
+
+    @cached_property
+    def _max_workers(self):
+        """Get the number of images to upload in parallel"""
+        return max(
+            1,
+            min(
+                len(self.images_to_upload),
+                self.configuration.S3_MAX_CONCURRENCY
+            )
+        )
+
+    @cached_property
+    def _transfer_config(self):
+        """Get transfer config for parallel multipart uploads"""
+        multipart_size = (
+            self.configuration.S3_MULTIPART_THRESHOLD_MB * 1024 * 1024
+        )
+        # Split the connection pool between the parallel image uploads
+        # so that their multipart upload parts never exceed the pool size
+        max_concurrency = max(
+            1, self.configuration.S3_MAX_CONCURRENCY // self._max_workers
+        )
+        return TransferConfig(
+            multipart_threshold=multipart_size,
+            multipart_chunksize=multipart_size,
+            max_concurrency=max_concurrency,
+            use_threads=True,
+        )
+
+    def _get_object_key(self, filename):
+        """Get S3 Object Key for the Image"""
+        if self.configuration.S3_KEY_PREFIX:
+            return f'{self.configuration.S3_KEY_PREFIX}/{filename}'
+        return filename
+
+    def _get_s3_image_url(self, object_key):
+        """Get S3 Image URL"""
+        bucket = self.configuration.S3_BUCKET
+
+        if self.configuration.S3_URL_TYPE == self.configuration.S3_URL_TYPE_PRESIGNED:
+            return self._client.generate_presigned_url(
+                'get_object',
+                Params={'Bucket': bucket, 'Key': object_key},
+                ExpiresIn=self.configuration.S3_PRESIGNED_URL_EXPIRY,
+            )
+
+        # Filenames are generated from the captured URLs,
+        # so they may contain characters like `?`, `#` or `%`
+        quoted_object_key = quote(object_key)
+
+        if self.configuration.S3_PUBLIC_URL_BASE:
+            return f'{self.configuration.S3_PUBLIC_URL_BASE}/{quoted_object_key}'
+
+        if self.configuration.S3_ENDPOINT_URL:
+            endpoint_url = self.configuration.S3_ENDPOINT_URL.rstrip('/')
+            return f'{endpoint_url}/{bucket}/{quoted_object_key}'
+
+        region = self._client.meta.region_name
+        return f'https://{bucket}.s3.{region}.amazonaws.com/{quoted_object_key}'
+
+    def _upload_single_image(self, filename, image_data):
+        """Upload a Single Image to S3 Compatible Object Storage"""
+        object_key = self._get_object_key(filename)
+
+        try:
+            # Images larger than the multipart threshold are uploaded
+            # in parts concurrently.
+            self._client.upload_fileobj(
+                io.BytesIO(image_data),
+                self.configuration.S3_BUCKET,
+                object_key,
+                ExtraArgs={'ContentType': self.CONTENT_TYPE},
+                Config=self._transfer_config,
+            )
+            link = self._get_s3_image_url(object_key)
+        except (BotoCoreError, ClientError) as e:
+            msg = (
+                f'Error while trying to upload "{filename}" to '
+                f'S3 bucket "{self.configuration.S3_BUCKET}". Error: {e}'
+            )
+            print_message(msg, message_type='error')
+            return None
+
+        print_message(f'Image "{filename}" Uploaded to "{link}"')
+        return link
+
+    def upload(self):
+        """Upload Images to S3 Compatible Object Storage in Parallel"""
+        if not self.images_to_upload:
+            return []
+
+        if not self.configuration.S3_BUCKET:
+            print_message(
+                '`s3_bucket` input is required to upload screenshots to S3',
+                message_type='error'
+            )
+            return []
+
+        print_message('Upload Screenshots', message_type='group')
+
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            image_urls = executor.map(
+                lambda file: self._upload_single_image(
+                    file['filename'], file['data']
+                ),
+                self.images_to_upload
+            )
+
+            for file, image_url in zip(self.images_to_upload, image_urls):
+                if image_url:
+                    self._add_uploaded_image(file, image_url)
+
+        print_message('', message_type='endgroup')
+
+        return self.uploaded_images
+
+
+@register_image_upload_service(Configuration.UPLOAD_SERVICE_LOCAL_DIRECTORY)
+class LocalDirectoryImageUploadService(ImageUploadServiceBase):
+    """Service to Save Images to a Local Directory"""
+
+    UPLOAD_DELAY_SECONDS = 0
+
+    def _get_local_image_url(self, filename):
+        """Get Image URL from the configured base URL"""
+        return f'{self.configuration.LOCAL_DIRECTORY_BASE_URL}/{filename}'
+
+    def _upload_single_image(self, filename, image_data):
+        """Save a Single Image to the Local Directory"""
+        directory = self.configuration.LOCAL_DIRECTORY_PATH
+        file_path = os.path.join(directory, filename)
+
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with open(file_path, 'wb') as image_file:
+                image_file.write(image_data)
+        except OSError as e:
+            msg = (
+                f'Error while trying to save "{filename}" to '
+                f'"{directory}". Error: {e}'
+            )
+            print_message(msg, message_type='error')
+            return None
+
+        link = self._get_local_image_url(filename)
+        print_message(f'Image "{filename}" Saved to "{file_path}"')
+        return link
+
+    def upload(self):
+        """Save Images to the Local Directory"""
+        if not self.images_to_upload:
+            return []
+
+        # Images can not be shown on the comment without a URL
+        if not self.configuration.LOCAL_DIRECTORY_BASE_URL:
+            print_message(
+                '`local_directory_base_url` input is required to save '
+                'screenshots to a local directory',
+                message_type='error'
+            )
+            return []
+
+        return super().upload()
@@ -1,3 +1,4 @@
+import base64
 import json
 import os
 import subprocess
@@ -10,8 +11,14 @@ import requests
 from config import Configuration
 from helpers import print_message
 from image_upload_services import (
-    GitHubBranchImageUploadService,
-    ImgurImageUploadService,
+    IMAGE_UPLOAD_SERVICES,
+    get_image_upload_service,
+)
+from performance import (
+    PerformanceManifest,
+    compare_performance_metrics,
+    format_performance_comment,
+    has_performance_regression,
 )
 
 
@@ -22,6 +29,9 @@ class WebpageScreenshotAction:
     """
 
     GITHUB_API_URL = 'https://api.github.com'
+    CAPTURE_SCRIPT_PATH = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'capture.js'
+    )
 
     def __init__(self, configuration):
         self.configuration = configuration
@@ -34,20 +44,43 @@ class WebpageScreenshotAction:
             'authorization': f'Bearer {self.configuration.GITHUB_TOKEN}'
         }
 
-    @staticmethod
-    def _capture_screenshot(filename, url_or_file_path):
-        """Capture a screenshot from url or file path"""
-        launch_options = {"args": ["--no-sandbox"]}
+    def _capture_screenshot(self, url_or_file_path):
+        """
+        Capture screenshots and performance metrics from url or file path
+        using a single page load.
+
+        Captures a full page screenshot, or a screenshot of each element
+        configured for the url or file path in `CAPTURE_ELEMENTS`.
+
+        Returns a dictionary or None
+
+        {
+            'screenshots': [{'name': element, 'data': image_data}],
+            'metrics': metrics
+        }
+        """
+        capture_options = {
+            'url': url_or_file_path,
+            'elements': self.configuration.CAPTURE_ELEMENTS.get(
+                url_or_file_path, []
+            ),
+            # Only Performance Metrics are recorded for push events
+            'screenshot': (
+                self.configuration.GITHUB_EVENT_NAME !=
+                self.configuration.PUSH_EVENT
+            ),
+            'metrics': self.configuration.CAPTURE_PERFORMANCE_METRICS,
+        }
         screenshot_capture_command = [
-            "capture-website",
-            "--launch-options",
-            f"{json.dumps(launch_options)}",
-            "--full-page",
-            url_or_file_path
+            "node",
+            self.CAPTURE_SCRIPT_PATH,
+            f"{json.dumps(capture_options)}",
         ]
 
         try:
-            return subprocess.check_output(screenshot_capture_command)
+            output = json.loads(
+                subprocess.check_output(screenshot_capture_command)
+            )
         except subprocess.CalledProcessError as e:
             msg = (
                 f'Error while trying to Capture Screenshot for "{url_or_file_path}". '
@@ -55,6 +88,31 @@ class WebpageScreenshotAction:
             )
             print_message(msg, message_type='error')
             return None
+        except (OSError, ValueError) as e:
+            # `node` is not installed or the output is not valid JSON
+            msg = (
+                f'Error while trying to Capture Screenshot for "{url_or_file_path}". '
+                f'Error: {e}'
+            )
+            print_message(msg, message_type='error')
+            return None
+
+        for error in output['errors']:
+            print_message(
+                f'{error} on "{url_or_file_path}"',
+                message_type='warning'
+            )
+
+        return {
+            'screenshots': [
+                {
+                    'name': screenshot['name'],
+                    'data': base64.b64decode(screenshot['data'])
+                }
+                for screenshot in output['screenshots']
+            ],
+            'metrics': output['metrics']
+        }
 
     def _get_pull_request_changed_files(self):
         """Gets changed files from the pull request"""
@@ -85,9 +143,12 @@ class WebpageScreenshotAction:
             and file['status'] != 'removed'
         ]
 
-    def _comment_screenshots(self, images):
-        """Comments Screenshots to the pull request"""
-        string_data = '## Here are the Screenshots after the Latest Changes\n\n'
+    def _comment_screenshots(self, images, performance_results):
+        """Comments Screenshots and Performance Metrics to the pull request"""
+        string_data = ''
+
+        if images:
+            string_data += '## Here are the Screenshots after the Latest Changes\n\n'
 
         for image in images:
             file_path, filename, url = (
@@ -95,6 +156,13 @@ class WebpageScreenshotAction:
             )
             string_data += f'### {file_path}\n![{filename}]({url})\n'
 
+        if performance_results:
+            if images:
+                string_data += '\n'
+            string_data += format_performance_comment(
+                performance_results, self.configuration.GITHUB_BASE_REF
+            )
+
         comment_url = (
             f'{self.GITHUB_API_URL}/repos/{self.configuration.GITHUB_REPOSITORY}/'
             f'issues/{self.configuration.GITHUB_PULL_REQUEST_NUMBER}/comments'
@@ -120,12 +188,7 @@ class WebpageScreenshotAction:
 
     def _get_image_upload_service(self):
         """Get image upload service"""
-        if self.configuration.UPLOAD_TO == self.configuration.UPLOAD_SERVICE_IMGUR:
-            return ImgurImageUploadService
-        elif self.configuration.UPLOAD_TO == self.configuration.UPLOAD_SERVICE_GITHUB_BRANCH:
-            return GitHubBranchImageUploadService
-        else:
-            return NotImplemented
+        return get_image_upload_service(self.configuration.UPLOAD_TO)
 
     def _get_image_filename(self, file_path):
         """Generate Filename from url or file path"""
@@ -134,14 +197,82 @@ class WebpageScreenshotAction:
             f'-{int(time.time())}.png'
         ).replace('/', '-').replace(' ', '')
 
+    def _compare_performance_metrics(self, performance_metrics):
+        """
+        Compare performance metrics with the base branch metrics
+        and store them in the performance manifest.
+        """
+        print_message('Compare Performance Metrics', message_type='group')
+
+        manifest = PerformanceManifest(self.configuration)
+        is_loaded = manifest.load()
+
+        baseline_metrics = {}
+
+        if self.configuration.GITHUB_EVENT_NAME == self.configuration.PULL_REQUEST_EVENT:
+            baseline_metrics = manifest.get_branch_metrics(
+                self.configuration.GITHUB_BASE_REF
+            )
+
+            if not baseline_metrics:
+                print_message(
+                    'No Performance Metrics found for the base branch '
+                    f'"{self.configuration.GITHUB_BASE_REF}"'
+                )
+
+        performance_results = []
+
+        for file_path in sorted(performance_metrics):
+            comparison = compare_performance_metrics(
+                performance_metrics[file_path],
+                baseline_metrics.get(file_path, {}),
+                self.configuration.PERFORMANCE_BUDGETS
+            )
+
+            for row in comparison:
+                if row['regression']:
+                    print_message(
+                        f'Performance regression in "{row["metric"]}" '
+                        f'for "{file_path}": {row["value"]}',
+                        message_type='warning'
+                    )
+
+            performance_results.append(
+                {
+                    'file_path': file_path,
+                    'comparison': comparison
+                }
+            )
+
+        # Only push events record the metrics of a branch, pull requests
+        # test the merge commit and must not overwrite the base branch metrics.
+        # Do not overwrite the manifest if it could not be loaded.
+        if (
+            self.configuration.GITHUB_EVENT_NAME == self.configuration.PUSH_EVENT
+            and is_loaded and self.configuration.GITHUB_BRANCH_NAME
+        ):
+            manifest.save(
+                self.configuration.GITHUB_BRANCH_NAME, performance_metrics
+            )
+
+        print_message('', message_type='endgroup')
+
+        return performance_results
+
     def run(self):
-        # Merge URLs and File Paths Together
+        is_push_event = (
+            self.configuration.GITHUB_EVENT_NAME ==
+            self.configuration.PUSH_EVENT
+        )
+
+        # Merge URLs, File Paths and Element Captures Together
         to_capture_list = (
             self.configuration.CAPTURE_URLS +
-            self.configuration.CAPTURE_HTML_FILE_PATHS
+            self.configuration.CAPTURE_HTML_FILE_PATHS +
+            list(self.configuration.CAPTURE_ELEMENTS)
         )
 
-        if self.configuration.CAPTURE_CHANGED_HTML_FILES:
+        if self.configuration.CAPTURE_CHANGED_HTML_FILES and not is_push_event:
             # Add Pull request changed/added HTML files to `to_capture_list`
             changed_files = self._get_pull_request_changed_files()
             to_capture_list += changed_files
@@ -150,31 +281,59 @@ class WebpageScreenshotAction:
         image_upload_service = self._get_image_upload_service()(
             self.configuration
         )
+        performance_metrics = {}
 
         for item in set(to_capture_list):
             file_path = item
-            # Generate Image Filename
-            filename = self._get_image_filename(file_path)
             # Group: Webpage Screen Capture
             print_message(
                 f'Capture Screenshot for "{file_path}"',
                 message_type='group'
             )
-            # Capture Screenshot
-            image_data = self._capture_screenshot(filename, item)
+            # Capture Screenshot and Performance Metrics
+            capture = self._capture_screenshot(item)
             print_message('', message_type='endgroup')
-            # Add Image to Uploader Service
-            if image_data:
-                image_upload_service.add(file_path, filename, image_data)
+
+            if not capture:
+                continue
+
+            # Add Images to Uploader Service
+            for index, screenshot in enumerate(capture['screenshots'], 1):
+                label = file_path
+                # Generate Image Filename
+                filename = self._get_image_filename(file_path)
+
+                if screenshot['name']:
+                    label = f'{file_path} ({screenshot["name"]})'
+                    # Element screenshots are named by their position
+                    # as selectors are not safe to use in filenames
+                    filename = self._get_image_filename(
+                        f'{file_path}-element-{index}'
+                    )
+
+                image_upload_service.add(label, filename, screenshot['data'])
+
+            if capture['metrics']:
+                performance_metrics[file_path] = capture['metrics']
 
         uploaded_images = image_upload_service.upload()
 
-        # If any screenshot is uploaded comment the screenshots to the Pull Request
-        if uploaded_images:
+        performance_results = []
+
+        if performance_metrics:
+            performance_results = self._compare_performance_metrics(
+                performance_metrics
+            )
+
+        # If any screenshot is uploaded or performance metrics are captured
+        # comment them to the Pull Request
+        if not is_push_event and (uploaded_images or performance_results):
             print_message('Comment Webpage Screenshot', message_type='group')
-            self._comment_screenshots(uploaded_images)
+            self._comment_screenshots(uploaded_images, performance_results)
             print_message('', message_type='endgroup')
 
+        return performance_results
+
 
 if __name__ == '__main__':
     print_message('Parse Configuration', message_type='group')
@@ -195,7 +354,41 @@ if __name__ == '__main__':
         )
         sys.exit(1)
 
+    # If the image upload service is not registered
+    # Exit the script with code 1.
+    if get_image_upload_service(configuration.UPLOAD_TO) is None:
+        print_message(
+            f'Image upload service "{configuration.UPLOAD_TO}" is not available. '
+            f'Available services: "{sorted(IMAGE_UPLOAD_SERVICES)}"',
+            message_type='error'
+        )
+        sys.exit(1)
+
+    # Push events are only used to record the performance metrics
+    # of a branch, so they can be compared on pull requests.
+    if (
+        configuration.GITHUB_EVENT_NAME == configuration.PUSH_EVENT
+        and not configuration.CAPTURE_PERFORMANCE_METRICS
+    ):
+        print_message(
+            f'"{configuration.PUSH_EVENT}" event is only supported '
+            'if `capture_performance_metrics` is enabled',
+            message_type='error'
+        )
+        sys.exit(1)
+
     # Initialize the Webpage Screenshot Action
     action = WebpageScreenshotAction(configuration)
     # Run Action
-    action.run()
+    performance_results = action.run()
+
+    # Exit the script with code 1 if any performance budget is exceeded
+    if (
+        configuration.FAIL_ON_PERFORMANCE_REGRESSION
+        and has_performance_regression(performance_results)
+    ):
+        print_message(
+            'Performance budgets were exceeded',
+            message_type='error'
+        )
+        sys.exit(1)
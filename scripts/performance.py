@@ -0,0 +1,320 @@
+import base64
+import json
+from datetime import datetime, timezone
+from functools import cached_property
+
+import requests
+
+from config import PERFORMANCE_METRICS
+from helpers import print_message
+from image_upload_services import GitHubBranchImageUploadService
+
+
+class PerformanceManifest:
+    """
+    Performance Metrics Manifest Stored on the Screenshot Branch.
+
+    The manifest stores the latest performance metrics of each branch:
+
+    {
+        'branches': {
+            branch_name: {
+                'commit': commit_sha,
+                'updated_at': iso_datetime,
+                'pages': {file_path: metrics}
+            }
+        }
+    }
+    """
+
+    GITHUB_API_URL = 'https://api.github.com'
+    BRANCH_NAME = GitHubBranchImageUploadService.BRANCH_NAME
+    MANIFEST_PATH = (
+        f'{GitHubBranchImageUploadService.IMAGE_UPLOAD_DIRECTORY}'
+        '/performance-manifest.json'
+    )
+    AUTHOR_NAME = GitHubBranchImageUploadService.AUTHOR_NAME
+    AUTHOR_EMAIL = GitHubBranchImageUploadService.AUTHOR_EMAIL
+    SAVE_RETRIES = 3
+
+    def __init__(self, configuration):
+        self.configuration = configuration
+        self.data = {'branches': {}}
+        self._sha = None
+
+    @cached_property
+    def _request_headers(self):
+        """Get headers for GitHub API request"""
+        return {
+            'Accept': 'application/vnd.github.v3+json',
+            'authorization': f'Bearer {self.configuration.GITHUB_TOKEN}'
+        }
+
+    @cached_property
+    def _repository_url(self):
+        return f'{self.GITHUB_API_URL}/repos/{self.configuration.GITHUB_REPOSITORY}'
+
+    def _create_branch_if_not_exists(self):
+        """Create the Screenshot Branch from the current commit if it does not exist"""
+        response = requests.get(
+            f'{self._repository_url}/branches/{self.BRANCH_NAME}',
+            headers=self._request_headers
+        )
+
+        if response.status_code != 404:
+            return response.status_code == 200
+
+        response = requests.post(
+            f'{self._repository_url}/git/refs',
+            headers=self._request_headers,
+            json={
+                'ref': f'refs/heads/{self.BRANCH_NAME}',
+                'sha': self.configuration.GITHUB_SHA
+            }
+        )
+        return response.status_code == 201
+
+    def load(self):
+        """Load the manifest from the Screenshot Branch"""
+        response = requests.get(
+            f'{self._repository_url}/contents/{self.MANIFEST_PATH}',
+            headers=self._request_headers,
+            params={'ref': self.BRANCH_NAME}
+        )
+
+        if response.status_code == 404:
+            # Manifest or branch does not exist yet
+            self.data, self._sha = {'branches': {}}, None
+            return True
+
+        if response.status_code != 200:
+            msg = (
+                'Error while trying to get the performance manifest. '
+                'GitHub API returned error response for '
+                f'{self.configuration.GITHUB_REPOSITORY}, '
+                f'status code: {response.status_code}'
+            )
+            print_message(msg, message_type='error')
+            return False
+
+        content = response.json()
+
+        try:
+            self.data = json.loads(base64.b64decode(content['content']))
+        except ValueError:
+            print_message(
+                'Performance manifest is invalid, it will be overwritten',
+                message_type='warning'
+            )
+            self.data = {'branches': {}}
+
+        self._sha = content['sha']
+        return True
+
+    def get_branch_metrics(self, branch_name):
+        """Get performance metrics of all the pages for a branch"""
+        branch = self.data.get('branches', {}).get(branch_name) or {}
+        return branch.get('pages', {})
+
+    def _update_branch_metrics(self, branch_name, pages):
+        branches = self.data.setdefault('branches', {})
+        branch = branches.setdefault(branch_name, {'pages': {}})
+        branch['commit'] = self.configuration.GITHUB_SHA
+        branch['updated_at'] = datetime.now(timezone.utc).isoformat()
+        branch.setdefault('pages', {}).update(pages)
+
+    def save(self, branch_name, pages):
+        """Save performance metrics of a branch to the Screenshot Branch"""
+        if not self._create_branch_if_not_exists():
+            print_message(
+                f'Unable to create branch "{self.BRANCH_NAME}" '
+                'to store the performance manifest',
+                message_type='error'
+            )
+            return False
+
+        for _ in range(self.SAVE_RETRIES):
+            self._update_branch_metrics(branch_name, pages)
+
+            data = {
+                'message': (
+                    '[webpage-screenshot-action] Updated Performance Metrics '
+                    f'for "{branch_name}"'
+                ),
+                'content': base64.b64encode(
+                    json.dumps(self.data, indent=2, sort_keys=True).encode('utf-8')
+                ).decode('utf-8'),
+                'branch': self.BRANCH_NAME,
+                'author': {
+                    'name': self.AUTHOR_NAME,
+                    'email': self.AUTHOR_EMAIL
+                },
+                'committer': {
+                    'name': self.AUTHOR_NAME,
+                    'email': self.AUTHOR_EMAIL
+                }
+            }
+
+            if self._sha:
+                data['sha'] = self._sha
+
+            response = requests.put(
+                f'{self._repository_url}/contents/{self.MANIFEST_PATH}',
+                headers=self._request_headers,
+                json=data
+            )
+
+            if response.status_code in [200, 201]:
+                self._sha = response.json()['content']['sha']
+                print_message(
+                    f'Performance Metrics for "{branch_name}" '
+                    f'Saved to "{self.MANIFEST_PATH}"'
+                )
+                return True
+
+            # The manifest was updated by another workflow run,
+            # reload it and try again.
+            if response.status_code not in [409, 422] or not self.load():
+                break
+
+        msg = (
+            'Error while trying to save the performance manifest. '
+            'GitHub API returned error response for '
+            f'{self.configuration.GITHUB_REPOSITORY}, '
+            f'status code: {response.status_code}'
+        )
+        print_message(msg, message_type='error')
+        return False
+
+
+def compare_performance_metrics(metrics, baseline_metrics, budgets):
+    """
+    Compare performance metrics of a page with the base branch metrics
+    and check them against the performance budgets.
+
+    Returns a list of dictionaries
+
+    [{
+        'metric': metric_name,
+        'value': value,
+        'baseline': baseline_value,
+        'budgeted': bool,
+        'budget_checked': bool,
+        'regression': bool
+    }]
+    """
+    comparison = []
+
+    for metric in PERFORMANCE_METRICS:
+        value = metrics.get(metric)
+        baseline = baseline_metrics.get(metric)
+        budget = budgets.get(metric, {})
+        # Budgets can not be checked without a value,
+        # and relative budgets also need a base branch value
+        budget_checked = False
+        regression = False
+
+        if value is not None and 'absolute' in budget:
+            budget_checked = True
+            if value > budget['absolute']:
+                regression = True
+
+        if value is not None and baseline is not None and 'relative' in budget:
+            budget_checked = True
+            # Any increase over a zero baseline exceeds a relative budget
+            if value > baseline * (1 + budget['relative'] / 100):
+                regression = True
+
+        comparison.append(
+            {
+                'metric': metric,
+                'value': value,
+                'baseline': baseline,
+                'budgeted': bool(budget),
+                'budget_checked': budget_checked,
+                'regression': regression
+            }
+        )
+
+    return comparison
+
+
+def has_performance_regression(performance_results):
+    """Check if any page has a performance regression"""
+    return any(
+        row['regression']
+        for result in performance_results
+        for row in result['comparison']
+    )
+
+
+def _format_metric_value(metric, value):
+    if value is None:
+        return 'N/A'
+
+    unit = PERFORMANCE_METRICS[metric][1]
+
+    if unit == 'ms':
+        return f'{value:,.0f} ms'
+    elif unit == 'bytes':
+        return f'{value / 1024:,.1f} KB'
+    elif unit == 'count':
+        return f'{value:,.0f}'
+    return f'{value:.3f}'
+
+
+def _format_metric_change(metric, value, baseline):
+    if value is None or baseline is None:
+        return 'N/A'
+
+    change = value - baseline
+    formatted_change = _format_metric_value(metric, change)
+
+    if change > 0:
+        formatted_change = f'+{formatted_change}'
+
+    if baseline:
+        formatted_change += f' ({change / baseline:+.1%})'
+
+    return formatted_change
+
+
+def format_performance_comment(performance_results, baseline_branch):
+    """Generate markdown tables of the performance metrics for each page"""
+    string_data = '## Performance Metrics\n\n'
+
+    if baseline_branch:
+        string_data += f'Compared to the `{baseline_branch}` branch.\n\n'
+
+    for result in performance_results:
+        string_data += (
+            f'### {result["file_path"]}\n\n'
+            '| Metric | Value | Base | Change | Budget |\n'
+            '|--------|-------|------|--------|--------|\n'
+        )
+
+        for row in result['comparison']:
+            metric, value, baseline = (
+                row['metric'], row['value'], row['baseline']
+            )
+
+            if row['regression']:
+                budget_status = ':x:'
+            elif row['budget_checked']:
+                budget_status = ':white_check_mark:'
+            elif row['budgeted']:
+                budget_status = 'N/A'
+            else:
+                budget_status = ''
+
+            string_data += (
+                f'| {PERFORMANCE_METRICS[metric][0]} '
+                f'| {_format_metric_value(metric, value)} '
+                f'| {_format_metric_value(metric, baseline)} '
+                f'| {_format_metric_change(metric, value, baseline)} '
+                f'| {budget_status} |\n'
+            )
+
+        string_data += '\n'
+
+    return string_data